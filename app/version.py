@@ -1,5 +1,8 @@
 import dataclasses
+import functools
 import json
+import os
+import pathlib
 import ssl
 import urllib.request
 from datetime import date
@@ -60,16 +63,41 @@ def local_version():
         return '0.0.0-0+aaaaaaa'
 
     try:
-        with open(_VERSION_FILE, encoding='utf-8') as file:
-            version = file.read().strip()
-    except UnicodeDecodeError as e:
-        raise VersionFileError(
-            'The local version file must only contain UTF-8 characters.') from e
+        mtime_ns = os.stat(_VERSION_FILE).st_mtime_ns
     except IOError as e:
         raise VersionFileError(f'Failed to check local version: {e}') from e
-    if version == '':
+    return _read_version_file(_VERSION_FILE, mtime_ns)
+
+
+@functools.lru_cache(maxsize=4)
+def _read_version_file(path, mtime_ns):  # pylint: disable=unused-argument
+    """Reads the version string from the version file.
+
+    The result is cached for the file's modification time, so the file only
+    gets read again once it changes on disk (e.g., after an update). Errors are
+    raised instead of returned, so they never end up in the cache.
+
+    Args:
+        path: The path to the version file.
+        mtime_ns: The modification time of the version file, in nanoseconds.
+
+    Returns:
+        A version string (e.g., "1.2.3-16+7a6c812").
+
+    Raises:
+        VersionFileError: If an error occurred while accessing the version file.
+    """
+    try:
+        version_bytes = pathlib.Path(path).read_bytes().strip()
+    except IOError as e:
+        raise VersionFileError(f'Failed to check local version: {e}') from e
+    if not version_bytes:
         raise VersionFileError('The local version file cannot be empty.')
-    return version
+    try:
+        return version_bytes.decode('utf-8')
+    except UnicodeDecodeError as e:
+        raise VersionFileError(
+            'The local version file must only contain UTF-8 characters.') from e
 
 
 def latest_version():
@@ -1,5 +1,7 @@
+import contextlib
 import io
 import json
+import os
 import tempfile
 import urllib.error
 import urllib.request
@@ -11,134 +13,172 @@ import version
 
 class LocalVersionTest(TestCase):
 
-    def setUp(self):
+    @classmethod
+    def setUpClass(cls):
+        # Share one temporary directory across all tests of this class, and
+        # give each test its own version file within it.
+        # pylint: disable=consider-using-with
+        cls.mock_version_dir = tempfile.TemporaryDirectory()
+        cls.addClassCleanup(cls.mock_version_dir.cleanup)
+
         # Run all unit tests with debug mode disabled.
         is_debug_patch = mock.patch.object(version,
                                            '_is_debug',
                                            return_value=False)
-        self.addCleanup(is_debug_patch.stop)
+        cls.addClassCleanup(is_debug_patch.stop)
         is_debug_patch.start()
 
+    def setUp(self):
+        # pylint: disable=protected-access
+        version._read_version_file.cache_clear()
+
+        self.version_file_path = os.path.join(self.mock_version_dir.name,
+                                              self.id())
+        path_patch = mock.patch.object(version, '_VERSION_FILE',
+                                       self.version_file_path)
+        self.addCleanup(path_patch.stop)
+        path_patch.start()
+
+    def make_mock_version_file(self, contents):
+        with open(self.version_file_path, 'wb') as mock_file:
+            mock_file.write(contents)
+
     def test_local_version_when_file_exists(self):
-        with tempfile.NamedTemporaryFile('w',
-                                         encoding='utf-8') as mock_version_file:
-            mock_version_file.write('1.2.3-16+7a6c812')
-            mock_version_file.flush()
+        self.make_mock_version_file(b'1.2.3-16+7a6c812')
 
-            with mock.patch.object(version, '_VERSION_FILE',
-                                   mock_version_file.name):
-                self.assertEqual('1.2.3-16+7a6c812', version.local_version())
+        self.assertEqual('1.2.3-16+7a6c812', version.local_version())
 
     def test_local_version_strips_leading_trailing_whitespace(self):
-        with tempfile.NamedTemporaryFile('w',
-                                         encoding='utf-8') as mock_version_file:
-            mock_version_file.write('    1.2.3-16+7a6c812   \n')
-            mock_version_file.flush()
+        self.make_mock_version_file(b'    1.2.3-16+7a6c812   \n')
 
-            with mock.patch.object(version, '_VERSION_FILE',
-                                   mock_version_file.name):
-                self.assertEqual('1.2.3-16+7a6c812', version.local_version())
+        self.assertEqual('1.2.3-16+7a6c812', version.local_version())
+
+    def test_local_version_uses_cache_when_file_is_unchanged(self):
+        self.make_mock_version_file(b'1.2.3-16+7a6c812')
+        os.utime(self.version_file_path, ns=(0, 0))
+        self.assertEqual('1.2.3-16+7a6c812', version.local_version())
+
+        # Rewrite the file without changing its modification time, so the
+        # cached version string should come back.
+        self.make_mock_version_file(b'1.2.4-17+8b7d923')
+        os.utime(self.version_file_path, ns=(0, 0))
+        self.assertEqual('1.2.3-16+7a6c812', version.local_version())
+
+    def test_local_version_rereads_file_when_it_changes(self):
+        self.make_mock_version_file(b'1.2.3-16+7a6c812')
+        os.utime(self.version_file_path, ns=(0, 0))
+        self.assertEqual('1.2.3-16+7a6c812', version.local_version())
+
+        self.make_mock_version_file(b'1.2.4-17+8b7d923')
+        os.utime(self.version_file_path, ns=(1, 1))
+        self.assertEqual('1.2.4-17+8b7d923', version.local_version())
 
     def test_local_version_raises_file_error_when_file_doesnt_exist(self):
-        with mock.patch.object(version, '_VERSION_FILE',
-                               'non-existent-file.txt'):
-            with self.assertRaises(version.VersionFileError):
-                version.local_version()
+        with self.assertRaises(version.VersionFileError):
+            version.local_version()
 
     def test_local_version_raises_file_error_when_file_is_empty(self):
-        with tempfile.NamedTemporaryFile('w',
-                                         encoding='utf-8') as mock_version_file:
+        self.make_mock_version_file(b'')
 
-            with mock.patch.object(version, '_VERSION_FILE',
-                                   mock_version_file.name):
-                with self.assertRaises(version.VersionFileError):
-                    version.local_version()
+        with self.assertRaises(version.VersionFileError):
+            version.local_version()
 
     def test_local_version_raises_file_error_when_file_is_not_utf_8(self):
-        with tempfile.NamedTemporaryFile() as mock_version_file:
-            mock_version_file.write(b'\xff')
-            mock_version_file.flush()
+        self.make_mock_version_file(b'\xff')
 
-            with mock.patch.object(version, '_VERSION_FILE',
-                                   mock_version_file.name):
-                with self.assertRaises(version.VersionFileError):
-                    version.local_version()
+        with self.assertRaises(version.VersionFileError):
+            version.local_version()
 
 
 class LatestVersionTest(TestCase):
 
-    def setUp(self):
+    @classmethod
+    def setUpClass(cls):
         # Run all unit tests with version's debug mode enabled.
         version_is_debug_patch = mock.patch.object(version,
                                                    '_is_debug',
                                                    return_value=True)
-        self.addCleanup(version_is_debug_patch.stop)
+        cls.addClassCleanup(version_is_debug_patch.stop)
         version_is_debug_patch.start()
 
-    @mock.patch.object(urllib.request, 'urlopen')
-    def test_latest_version_when_request_is_successful(self, mock_urlopen):
-        mock_response = mock.Mock()
-        mock_response.read.return_value = json.dumps({
+    def setUp(self):
+        # Each test sets the response body or the error that the fake urlopen
+        # produces.
+        self.response_bytes = b''
+        self.urlopen_error = None
+        urlopen_patch = mock.patch.object(urllib.request, 'urlopen',
+                                          self.fake_urlopen)
+        self.addCleanup(urlopen_patch.stop)
+        urlopen_patch.start()
+
+    def fake_urlopen(self, *_args, **_kwargs):
+        if self.urlopen_error is not None:
+            raise self.urlopen_error
+        return contextlib.nullcontext(io.BytesIO(self.response_bytes))
+
+    def test_latest_version_when_request_is_successful(self):
+        self.response_bytes = json.dumps({
             'version': '1.2.3-16+7a6c812',
             'kind': 'automatic',
             'data': None,
         }).encode('utf-8')
-        mock_urlopen.return_value.__enter__.return_value = mock_response
 
         self.assertEqual('1.2.3-16+7a6c812', version.latest_version().version)
         self.assertEqual('automatic', version.latest_version().kind)
         self.assertEqual(None, version.latest_version().data)
 
-    @mock.patch.object(urllib.request, 'urlopen')
     def test_latest_version_raises_request_error_when_response_is_not_utf_8(
-            self, mock_urlopen):
-        mock_response = mock.Mock()
-        mock_response.read.return_value = b'\xff'
-        mock_urlopen.return_value.__enter__.return_value = mock_response
+            self):
+        self.response_bytes = b'\xff'
+
+        with self.assertRaises(version.VersionRequestError):
+            version.latest_version()
+
+    def test_latest_version_raises_request_error_when_response_is_utf_16(self):
+        self.response_bytes = json.dumps({
+            'version': '1.2.3-16+7a6c812',
+            'kind': 'automatic',
+            'data': None,
+        }).encode('utf-16')
+
+        with self.assertRaises(version.VersionRequestError):
+            version.latest_version()
+
+    def test_latest_version_raises_request_error_when_response_has_surrogate(
+            self):
+        self.response_bytes = (b'{"version": "\xed\xa0\x80", '
+                               b'"kind": "automatic", "data": null}')
 
         with self.assertRaises(version.VersionRequestError):
             version.latest_version()
 
-    @mock.patch.object(urllib.request, 'urlopen')
     def test_latest_version_raises_request_error_when_response_is_not_json(
-            self, mock_urlopen):
-        mock_response = mock.Mock()
-        mock_response.read.return_value = 'plain text'.encode('utf-8')
-        mock_urlopen.return_value.__enter__.return_value = mock_response
+            self):
+        self.response_bytes = 'plain text'.encode('utf-8')
 
         with self.assertRaises(version.VersionRequestError):
             version.latest_version()
 
-    @mock.patch.object(urllib.request, 'urlopen')
     def test_latest_version_raises_request_error_when_response_is_not_json_dict(
-            self, mock_urlopen):
-        mock_response = mock.Mock()
-        mock_response.read.return_value = json.dumps(
-            'json encoded string').encode('utf-8')
-        mock_urlopen.return_value.__enter__.return_value = mock_response
+            self):
+        self.response_bytes = json.dumps('json encoded string').encode('utf-8')
 
         with self.assertRaises(version.VersionRequestError):
             version.latest_version()
 
-    @mock.patch.object(urllib.request, 'urlopen')
     def test_latest_version_raises_request_error_when_response_missing_field(
-            self, mock_urlopen):
-        mock_response = mock.Mock()
-        mock_response.read.return_value = json.dumps({
+            self):
+        self.response_bytes = json.dumps({
             'wrong_field_name': 'wrong_field_value'
         }).encode('utf-8')
-        mock_urlopen.return_value.__enter__.return_value = mock_response
 
         with self.assertRaises(version.VersionRequestError):
             version.latest_version()
 
-    @mock.patch.object(urllib.request, 'urlopen')
-    def test_latest_version_raises_request_error_when_request_fails(
-            self, mock_urlopen):
-        urlopen_mock = mock.Mock(side_effect=urllib.error.HTTPError(
-            '127.0.0.1', 400, '400 Bad Request', None, io.BytesIO(
-                b'bad request')))
-        mock_urlopen.return_value.__enter__ = urlopen_mock
+    def test_latest_version_raises_request_error_when_request_fails(self):
+        self.urlopen_error = urllib.error.HTTPError('127.0.0.1', 400,
+                                                    '400 Bad Request', None,
+                                                    io.BytesIO(b'bad request'))
 
         with self.assertRaises(version.VersionRequestError) as ctx:
             version.latest_version()
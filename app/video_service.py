@@ -1,11 +1,20 @@
-import contextlib
 import logging
+import pathlib
 import subprocess
 
 import db.settings
 
 logger = logging.getLogger(__name__)
 
+# These commands must match their entries in /etc/sudoers.d/tinypilot exactly,
+# so we use absolute paths instead of resolving the executables via `PATH`.
+_CONFIGURE_JANUS_COMMAND = ('/usr/bin/sudo',
+                            '/opt/tinypilot-privileged/scripts/configure-janus')
+_USTREAMER_RESTART_COMMAND = ('/usr/bin/sudo', '/usr/sbin/service', 'ustreamer',
+                              'restart')
+_JANUS_RESTART_COMMAND = ('/usr/bin/sudo', '/usr/sbin/service', 'janus',
+                          'restart')
+
 # To create a new EDID:
 #  1. Convert the existing EDID to binary using "edid2bin".
 #  2. Edit the binary using "AW EDID Editor v.02.00.13".
@@ -26,11 +35,19 @@ _EDID_PI4_FILE = '/usr/share/tinypilot/edid_pi4.hex'
 
 
 def _get_default_edid():
-    with contextlib.suppress(FileNotFoundError):
-        with open(_EDID_PI4_FILE, encoding='utf-8') as file:
-            return file.read().strip()
+    try:
+        edid_bytes = pathlib.Path(_EDID_PI4_FILE).read_bytes()
+    except FileNotFoundError:
+        return None
 
-    return None
+    # The file contains hex characters only, so we read it as raw bytes and
+    # only decode it after stripping.
+    try:
+        return edid_bytes.strip().decode('ascii')
+    except UnicodeDecodeError as e:
+        logger.warning('Ignoring default EDID, because %s is corrupt: %s',
+                       _EDID_PI4_FILE, e)
+        return None
 
 
 DEFAULT_EDID = _get_default_edid()
@@ -44,61 +61,94 @@ DEFAULT_H264_STUN_PORT = None
 def restart():
     """Restarts the video streaming services for the remote screen.
 
-    It only triggers the restart, but it doesn’t actually wait for it to
-    complete.
+    It waits for the `service … restart` invocations to return and logs their
+    results, but it doesn’t wait for the streams to be available again. If
+    WebRTC is enabled, uStreamer and Janus are restarted concurrently.
     """
-    _restart_ustreamer()
     use_webrtc = db.settings.Settings().get_streaming_mode(
     ) == db.settings.StreamingMode.H264
-    if use_webrtc:
-        _restart_janus()
+
+    ustreamer_process = _restart_ustreamer()
+    try:
+        janus_process = _restart_janus() if use_webrtc else None
+    finally:
+        # Always reap the uStreamer restart, even if launching Janus failed.
+        _wait_for_service_restart('ustreamer', ustreamer_process)
+    if janus_process is not None:
+        _wait_for_service_restart('janus', janus_process)
 
 
 def _restart_ustreamer():
-    """Restarts uStreamer in a best-effort manner.
+    """Triggers a restart of uStreamer.
 
-    In case the restart invocation failed, it ignores (but logs) the error.
+    Returns:
+        The `subprocess.Popen` handle of the restart invocation.
     """
-    logger.info('Triggering ustreamer restart...')
-    try:
-        subprocess.check_output(
-            ['/usr/bin/sudo', '/usr/sbin/service', 'ustreamer', 'restart'],
-            stderr=subprocess.STDOUT,
-            universal_newlines=True)
-    except subprocess.CalledProcessError as e:
-        logger.error('Failed to restart ustreamer: %s', e)
-        return
-
-    logger.info('Successfully restarted ustreamer')
+    return _start_service_restart('ustreamer', _USTREAMER_RESTART_COMMAND)
 
 
 def _restart_janus():
-    """Restarts Janus in a best-effort manner.
+    """Triggers a restart of Janus in a best-effort manner.
 
     It also updates the Janus configuration (based on the settings file) before
     restarting.
 
-    In case the restart invocation failed, it ignores (but logs) the error.
+    In case the configuration failed, it ignores (but logs) the error, and it
+    doesn’t restart Janus.
+
+    Returns:
+        The `subprocess.Popen` handle of the restart invocation, or `None` if
+        the configuration failed.
     """
     logger.info('Writing janus configuration...')
     try:
-        subprocess.check_output([
-            '/usr/bin/sudo', '/opt/tinypilot-privileged/scripts/configure-janus'
-        ],
-                                stderr=subprocess.STDOUT,
-                                universal_newlines=True)
+        subprocess.run(  # noqa: S603
+            _CONFIGURE_JANUS_COMMAND,
+            stdout=subprocess.DEVNULL,
+            stderr=subprocess.PIPE,
+            check=True)
     except subprocess.CalledProcessError as e:
-        logger.error('Failed to configure janus: %s', e)
-        return
+        # The error output is only of interest in case of failure, so we only
+        # decode it here.
+        logger.error('Failed to configure janus (exit status %d): %s',
+                     e.returncode,
+                     e.stderr.decode('utf-8', errors='replace').strip())
+        return None
 
-    logger.info('Triggering janus restart...')
-    try:
-        subprocess.check_output(
-            ['/usr/bin/sudo', '/usr/sbin/service', 'janus', 'restart'],
-            stderr=subprocess.STDOUT,
-            universal_newlines=True)
-    except subprocess.CalledProcessError as e:
-        logger.error('Failed to restart janus: %s', e)
+    return _start_service_restart('janus', _JANUS_RESTART_COMMAND)
+
+
+def _start_service_restart(service, command):
+    """Launches a service restart without waiting for it to finish.
+
+    Args:
+        service: The name of the system service (e.g., "ustreamer").
+        command: The command that restarts the service.
+
+    Returns:
+        The `subprocess.Popen` handle of the restart invocation.
+    """
+    logger.info('Triggering %s restart...', service)
+    return subprocess.Popen(  # noqa: S603
+        command,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.PIPE)
+
+
+def _wait_for_service_restart(service, process):
+    """Waits for a service restart to finish in a best-effort manner.
+
+    In case the restart invocation failed, it ignores (but logs) the error.
+
+    Args:
+        service: The name of the system service (e.g., "ustreamer").
+        process: The `subprocess.Popen` handle of the restart invocation.
+    """
+    _, error_output = process.communicate()
+    if process.returncode != 0:
+        logger.error('Failed to restart %s (exit status %d): %s', service,
+                     process.returncode,
+                     error_output.decode('utf-8', errors='replace').strip())
         return
 
-    logger.info('Successfully restarted janus')
+    logger.info('Successfully restarted %s', service)
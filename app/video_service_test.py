@@ -0,0 +1,142 @@
+import subprocess
+import tempfile
+import unittest
+from unittest import mock
+
+import db.settings
+import video_service
+
+
+def make_mock_process(returncode=0, error_output=b''):
+    mock_process = mock.Mock()
+    mock_process.returncode = returncode
+    mock_process.communicate.return_value = (None, error_output)
+    return mock_process
+
+
+@mock.patch.object(video_service.subprocess, 'run')
+@mock.patch.object(video_service.subprocess, 'Popen')
+@mock.patch.object(video_service.db.settings, 'Settings')
+class RestartTest(unittest.TestCase):
+
+    def test_restarts_only_ustreamer_when_streaming_mode_is_mjpeg(
+            self, mock_settings, mock_popen, mock_run):
+        mock_settings.return_value.get_streaming_mode.return_value = (
+            db.settings.StreamingMode.MJPEG)
+        mock_ustreamer = make_mock_process()
+        mock_popen.return_value = mock_ustreamer
+
+        video_service.restart()
+
+        mock_run.assert_not_called()
+        mock_popen.assert_called_once_with(
+            ('/usr/bin/sudo', '/usr/sbin/service', 'ustreamer', 'restart'),
+            stdout=subprocess.DEVNULL,
+            stderr=subprocess.PIPE)
+        mock_ustreamer.communicate.assert_called_once()
+
+    def test_restarts_and_waits_for_both_services_when_streaming_mode_is_h264(
+            self, mock_settings, mock_popen, mock_run):
+        mock_settings.return_value.get_streaming_mode.return_value = (
+            db.settings.StreamingMode.H264)
+        mock_ustreamer = make_mock_process()
+        mock_janus = make_mock_process()
+        mock_popen.side_effect = [mock_ustreamer, mock_janus]
+
+        video_service.restart()
+
+        mock_run.assert_called_once_with(
+            ('/usr/bin/sudo',
+             '/opt/tinypilot-privileged/scripts/configure-janus'),
+            stdout=subprocess.DEVNULL,
+            stderr=subprocess.PIPE,
+            check=True)
+        self.assertEqual([
+            mock.call(
+                ('/usr/bin/sudo', '/usr/sbin/service', 'ustreamer', 'restart'),
+                stdout=subprocess.DEVNULL,
+                stderr=subprocess.PIPE),
+            mock.call(
+                ('/usr/bin/sudo', '/usr/sbin/service', 'janus', 'restart'),
+                stdout=subprocess.DEVNULL,
+                stderr=subprocess.PIPE),
+        ], mock_popen.call_args_list)
+        mock_ustreamer.communicate.assert_called_once()
+        mock_janus.communicate.assert_called_once()
+
+    def test_does_not_restart_janus_when_configuring_janus_fails(
+            self, mock_settings, mock_popen, mock_run):
+        mock_settings.return_value.get_streaming_mode.return_value = (
+            db.settings.StreamingMode.H264)
+        mock_ustreamer = make_mock_process()
+        mock_popen.return_value = mock_ustreamer
+        mock_run.side_effect = subprocess.CalledProcessError(
+            returncode=1, cmd='configure-janus', stderr=b'bad template\n')
+
+        with self.assertLogs('video_service', level='ERROR') as logs:
+            video_service.restart()
+
+        self.assertEqual([
+            'ERROR:video_service:Failed to configure janus (exit status 1):'
+            ' bad template'
+        ], logs.output)
+        mock_popen.assert_called_once()
+        mock_ustreamer.communicate.assert_called_once()
+
+    def test_logs_decoded_error_output_when_restart_fails(
+            self, mock_settings, mock_popen, _):
+        mock_settings.return_value.get_streaming_mode.return_value = (
+            db.settings.StreamingMode.MJPEG)
+        mock_popen.return_value = make_mock_process(
+            returncode=3, error_output=b'Job for ustreamer failed. \xff\n')
+
+        with self.assertLogs('video_service', level='ERROR') as logs:
+            video_service.restart()
+
+        self.assertEqual([
+            'ERROR:video_service:Failed to restart ustreamer (exit status 3):'
+            ' Job for ustreamer failed. \ufffd'
+        ], logs.output)
+
+    def test_waits_for_ustreamer_when_launching_janus_fails(
+            self, mock_settings, mock_popen, _):
+        mock_settings.return_value.get_streaming_mode.return_value = (
+            db.settings.StreamingMode.H264)
+        mock_ustreamer = make_mock_process()
+        mock_popen.side_effect = [mock_ustreamer, OSError('no such file')]
+
+        with self.assertRaises(OSError):
+            video_service.restart()
+
+        mock_ustreamer.communicate.assert_called_once()
+
+
+class DefaultEdidTest(unittest.TestCase):
+
+    def test_reads_and_strips_edid_file(self):
+        with tempfile.NamedTemporaryFile() as mock_edid_file:
+            mock_edid_file.write(b'00ffffffffffff00\n')
+            mock_edid_file.flush()
+
+            with mock.patch.object(video_service, '_EDID_PI4_FILE',
+                                   mock_edid_file.name):
+                # pylint: disable=protected-access
+                self.assertEqual('00ffffffffffff00',
+                                 video_service._get_default_edid())
+
+    def test_returns_none_when_edid_file_doesnt_exist(self):
+        with mock.patch.object(video_service, '_EDID_PI4_FILE',
+                               'non-existent-file.hex'):
+            # pylint: disable=protected-access
+            self.assertIsNone(video_service._get_default_edid())
+
+    def test_logs_warning_and_returns_none_when_edid_file_is_not_ascii(self):
+        with tempfile.NamedTemporaryFile() as mock_edid_file:
+            mock_edid_file.write(b'00ff\xff')
+            mock_edid_file.flush()
+
+            with mock.patch.object(video_service, '_EDID_PI4_FILE',
+                                   mock_edid_file.name):
+                with self.assertLogs('video_service', level='WARNING'):
+                    # pylint: disable=protected-access
+                    self.assertIsNone(video_service._get_default_edid())